@@ -1,18 +1,18 @@
 #!/usr/bin/env python
 """Client actions related to administrating the client and its configuration."""
 
+import atexit
+import functools
 import logging
 import os
 import platform
 import socket
+import stat as stat_mode
+import threading
 import traceback
+from typing import Any, Callable, Dict, Iterator, NamedTuple, Optional, Set, Tuple
 
-import cryptography
-from cryptography.hazmat.backends import openssl
-import pkg_resources
 import psutil
-import pytsk3
-import yara
 
 from grr_response_client import actions
 from grr_response_client.client_actions import tempfiles
@@ -94,67 +94,160 @@ class GetConfiguration(actions.ActionPlugin):
 
   def Run(self, unused_arg):
     """Retrieve the configuration except for the blocked parameters."""
+    fingerprint = _ConfigFingerprint()
+
+    with _CONFIG_SNAPSHOT_LOCK:
+      cached = _CONFIG_SNAPSHOT_CACHE.get(fingerprint)
+      # The config object flushes (i.e. replaces) its value cache whenever it
+      # is modified in memory, so a stale cache object means stale snapshot.
+      if cached is not None and cached[0] is config.CONFIG.cache:
+        self.SendReply(self.out_rdfvalues[0].FromSerializedBytes(cached[1]))
+        return
+
+      out = self.out_rdfvalues[0](dict(_ReadConfigValues()))
+
+      # Only the snapshot of the most recent configuration is ever useful.
+      _CONFIG_SNAPSHOT_CACHE.clear()
+      _CONFIG_SNAPSHOT_CACHE[fingerprint] = (
+          config.CONFIG.cache,
+          out.SerializeToBytes(),
+      )
+
+    self.SendReply(out)
+
+
+# Serialized `GetConfiguration` replies keyed by the fingerprint of the
+# writeback file they were computed from. Values also hold the config value
+# cache that was current at that time to detect in-memory modifications.
+_CONFIG_SNAPSHOT_CACHE: Dict[Tuple[Any, ...], Tuple[Dict[str, Any], bytes]] = {}
+_CONFIG_SNAPSHOT_LOCK = threading.Lock()
+
 
-    out = self.out_rdfvalues[0]()
-    for descriptor in config.CONFIG.type_infos:
-      try:
-        value = config.CONFIG.Get(descriptor.name, default=None)
-      except (config_lib.Error, KeyError, AttributeError, ValueError) as e:
+# Names of config options that already failed to be read. Failures are logged
+# only once per option so that repeated configuration polls do not flood logs.
+_UNREADABLE_CONFIG_OPTIONS: Set[str] = set()
+
+
+def _ReadConfigValues() -> Iterator[Tuple[str, Any]]:
+  """Yields names and values of all readable, non-empty config options."""
+  # Whether an option can be read depends on the (mutable) configuration, so
+  # options that failed before are still retried, just not reported again.
+  get = config.CONFIG.Get
+  for descriptor in config.CONFIG.type_infos:
+    name = descriptor.name
+    try:
+      value = get(name, default=None)
+    except (config_lib.Error, KeyError, AttributeError, ValueError) as e:
+      if name not in _UNREADABLE_CONFIG_OPTIONS:
+        _UNREADABLE_CONFIG_OPTIONS.add(name)
         logging.info("Config reading error: %s", e)
-        continue
+      continue
 
-      if value is not None:
-        out[descriptor.name] = value
+    if value is not None:
+      yield name, value
 
-    self.SendReply(out)
 
+def _ConfigFingerprint() -> Tuple[Optional[str], Optional[int], Optional[int]]:
+  """Returns a tuple identifying the current state of the writeback file."""
+  writeback = config.CONFIG.writeback
+  if writeback is None:
+    return (None, None, None)
 
-class GetLibraryVersions(actions.ActionPlugin):
-  """Retrieves version information for installed libraries."""
+  path = writeback.config_path
+  try:
+    stat = os.stat(path)
+  except (OSError, ValueError):
+    # Non-file writebacks (e.g. the Windows registry) cannot be stated. We still
+    # rely on the in-memory cache check in such cases.
+    return (path, None, None)
 
-  in_rdfvalue = None
-  out_rdfvalues = [rdf_protodict.Dict]
+  return (path, stat.st_mtime_ns, stat.st_size)
 
-  def GetSSLVersion(self):
-    return openssl.backend.openssl_version_text()
 
-  def GetCryptographyVersion(self):
-    return cryptography.__version__
+# Libraries below are imported lazily so that clients never asking for their
+# versions do not pay the price of loading them.
 
-  def GetPSUtilVersion(self):
-    return ".".join(map(utils.SmartUnicode, psutil.version_info))
 
-  def GetProtoVersion(self):
-    return pkg_resources.get_distribution("protobuf").version
+def _GetSSLVersion() -> str:
+  from cryptography.hazmat.backends import openssl  # pylint: disable=g-import-not-at-top
 
-  def GetTSKVersion(self):
-    return pytsk3.TSK_VERSION_STR
+  return openssl.backend.openssl_version_text()
 
-  def GetPyTSKVersion(self):
-    return pytsk3.get_version()
 
-  def GetYaraVersion(self):
-    return yara.YARA_VERSION
+def _GetCryptographyVersion() -> str:
+  import cryptography  # pylint: disable=g-import-not-at-top
 
-  library_map = {
-      "pytsk": GetPyTSKVersion,
-      "TSK": GetTSKVersion,
-      "cryptography": GetCryptographyVersion,
-      "SSL": GetSSLVersion,
-      "psutil": GetPSUtilVersion,
-      "yara": GetYaraVersion,
-  }
+  return cryptography.__version__
 
-  error_str = "Unable to determine library version: %s"
 
-  def Run(self, unused_arg):
-    result = self.out_rdfvalues[0]()
-    for lib, f in self.library_map.items():
-      try:
-        result[lib] = f(self)
-      except Exception:  # pylint: disable=broad-except
-        result[lib] = self.error_str % traceback.format_exc()
+def _GetPSUtilVersion() -> str:
+  return ".".join(map(utils.SmartUnicode, psutil.version_info))
+
+
+def _GetProtoVersion() -> str:
+  import pkg_resources  # pylint: disable=g-import-not-at-top
+
+  return pkg_resources.get_distribution("protobuf").version
+
+
+def _GetTSKVersion() -> str:
+  import pytsk3  # pylint: disable=g-import-not-at-top
+
+  return pytsk3.TSK_VERSION_STR
+
 
+def _GetPyTSKVersion() -> str:
+  import pytsk3  # pylint: disable=g-import-not-at-top
+
+  return pytsk3.get_version()
+
+
+def _GetYaraVersion() -> str:
+  import yara  # pylint: disable=g-import-not-at-top
+
+  return yara.YARA_VERSION
+
+
+_LIBRARY_MAP: Dict[str, Callable[[], str]] = {
+    "pytsk": _GetPyTSKVersion,
+    "TSK": _GetTSKVersion,
+    "cryptography": _GetCryptographyVersion,
+    "SSL": _GetSSLVersion,
+    "psutil": _GetPSUtilVersion,
+    "yara": _GetYaraVersion,
+}
+
+_LIBRARY_VERSION_ERROR = "Unable to determine library version: %s"
+
+
+@functools.lru_cache(maxsize=1)
+def _GetLibraryVersionsBytes() -> bytes:
+  """Returns the serialized dictionary of versions of libraries."""
+  # Library versions cannot change without restarting the client, so they are
+  # collected only once per process (errors included).
+  result = rdf_protodict.Dict()
+  for lib, f in _LIBRARY_MAP.items():
+    try:
+      result[lib] = f()
+    except Exception:  # pylint: disable=broad-except
+      result[lib] = _LIBRARY_VERSION_ERROR % traceback.format_exc()
+
+  return result.SerializeToBytes()
+
+
+class GetLibraryVersions(actions.ActionPlugin):
+  """Retrieves version information for installed libraries."""
+
+  in_rdfvalue = None
+  out_rdfvalues = [rdf_protodict.Dict]
+
+  library_map = _LIBRARY_MAP
+  error_str = _LIBRARY_VERSION_ERROR
+
+  def Run(self, unused_arg):
+    result = self.out_rdfvalues[0].FromSerializedBytes(
+        _GetLibraryVersionsBytes()
+    )
     self.SendReply(result)
 
 
@@ -163,13 +256,13 @@ class UpdateConfiguration(actions.ActionPlugin):
 
   in_rdfvalue = rdf_protodict.Dict
 
-  UPDATABLE_FIELDS = {"Client.foreman_check_frequency",
-                      "Client.server_urls",
-                      "Client.max_post_size",
-                      "Client.max_out_queue",
-                      "Client.poll_min",
-                      "Client.poll_max",
-                      "Client.rss_max"}  # pyformat: disable
+  UPDATABLE_FIELDS = frozenset({"Client.foreman_check_frequency",
+                                "Client.server_urls",
+                                "Client.max_post_size",
+                                "Client.max_out_queue",
+                                "Client.poll_min",
+                                "Client.poll_max",
+                                "Client.rss_max"})  # pyformat: disable
 
   def _UpdateConfig(self, filtered_arg, config_obj):
     for field, value in filtered_arg.items():
@@ -190,16 +283,11 @@ class UpdateConfiguration(actions.ActionPlugin):
 
     smart_arg = {str(field): value for field, value in arg.items()}
 
-    disallowed_fields = [
-        field
-        for field in smart_arg
-        if field not in UpdateConfiguration.UPDATABLE_FIELDS
-    ]
-
+    disallowed_fields = smart_arg.keys() - UpdateConfiguration.UPDATABLE_FIELDS
     if disallowed_fields:
       raise ValueError(
           "Received an update request for restricted field(s) %s."
-          % ",".join(disallowed_fields)
+          % ",".join(sorted(disallowed_fields))
       )
 
     if platform.system() != "Windows":
@@ -207,35 +295,160 @@ class UpdateConfiguration(actions.ActionPlugin):
       # implemented for our Windows clients though, whose configs are stored in
       # the registry, as opposed to in the filesystem.
 
-      canary_config = config.CONFIG.CopyConfig()
-
-      # Prepare a temporary file we'll write changes to.
-      with tempfiles.CreateGRRTempFile(mode="w+") as temp_fd:
-        temp_filename = temp_fd.name
+      with _CANARY_LOCK:
+        canary_config = config.CONFIG.CopyConfig()
 
-      # Write canary_config changes to temp_filename.
-      canary_config.SetWriteBack(temp_filename)
-      self._UpdateConfig(smart_arg, canary_config)
+        # Prepare an empty temporary file we'll write changes to.
+        temp_filename = _PrepareCanaryFile()
 
-      try:
-        # Assert temp_filename is usable by loading it.
+        # Write canary_config changes to temp_filename.
         canary_config.SetWriteBack(temp_filename)
-      # Wide exception handling passed here from config_lib.py...
-      except Exception:  # pylint: disable=broad-except
-        logging.warning("Updated config file %s is not usable.", temp_filename)
-        raise
-
-      # If temp_filename works, remove it (if not, it's useful for debugging).
-      os.unlink(temp_filename)
+        self._UpdateConfig(smart_arg, canary_config)
+
+        try:
+          # Assert temp_filename is usable by parsing it. The canary writeback
+          # parser already points at it, so there is no need to go through
+          # `SetWriteBack` (and merge the data into the canary config) again.
+          canary_config.writeback.ReadData()
+        # Wide exception handling passed here from config_lib.py...
+        except Exception:  # pylint: disable=broad-except
+          logging.warning(
+              "Updated config file %s is not usable.", temp_filename
+          )
+          # Leave the file in place as it is useful for debugging, subsequent
+          # updates will use a new one.
+          _ForgetCanaryFile()
+          raise
+
+        # The canary holds a full copy of the writeback data, so we do not want
+        # to leave it on disk between updates. If it cannot be truncated safely,
+        # subsequent updates will use a new one.
+        if not _TruncateCanaryFile():
+          _ForgetCanaryFile()
 
     # The changes seem to work, so push them to the real config.
     self._UpdateConfig(smart_arg, config.CONFIG)
 
 
+class _CanaryFile(NamedTuple):
+  """A temporary file reused for validating configuration changes."""
+
+  path: str
+  # Identities (`st_dev`, `st_ino`, `st_uid`) recorded when the file was
+  # created. They are checked before each reuse to make sure nobody swapped the
+  # file (or its directory) for something else in the meantime.
+  dir_id: Tuple[int, int, int]
+  file_id: Tuple[int, int, int]
+
+
+def _StatId(stat: os.stat_result) -> Tuple[int, int, int]:
+  return (stat.st_dev, stat.st_ino, stat.st_uid)
+
+
+# A temporary file reused across `UpdateConfiguration` calls for validating
+# configuration changes before they are applied.
+_CANARY: Optional[_CanaryFile] = None
+_CANARY_LOCK = threading.Lock()
+
+
+def _PrepareCanaryFile() -> str:
+  """Returns a path to an empty temporary file for config validation."""
+  global _CANARY
+
+  # Truncating the existing file is cheaper than creating a new one (and
+  # removing it afterwards) each time. If the file is gone (e.g. removed by temp
+  # files cleanup) or is not the one we created, we simply create a new one.
+  if _TruncateCanaryFile():
+    return _CANARY.path
+
+  with tempfiles.CreateGRRTempFile(mode="w+") as temp_fd:
+    path = temp_fd.name
+    file_id = _StatId(os.fstat(temp_fd.fileno()))
+    dir_id = _StatId(os.lstat(os.path.dirname(path)))
+
+  _CANARY = _CanaryFile(path=path, dir_id=dir_id, file_id=file_id)
+  return path
+
+
+def _TruncateCanaryFile() -> bool:
+  """Truncates the canary file if it is still the file we created.
+
+  Returns:
+    True if the file was verified and truncated, False otherwise.
+  """
+  if _CANARY is None:
+    return False
+
+  try:
+    dir_stat = os.lstat(os.path.dirname(_CANARY.path))
+  except OSError:
+    return False
+
+  # The directory must not have been replaced (e.g. with a symlink) nor made
+  # writable by anyone else.
+  if (
+      not stat_mode.S_ISDIR(dir_stat.st_mode)
+      or _StatId(dir_stat) != _CANARY.dir_id
+      or dir_stat.st_mode & (stat_mode.S_IWGRP | stat_mode.S_IWOTH)
+  ):
+    return False
+
+  try:
+    fd = os.open(_CANARY.path, os.O_WRONLY | os.O_NOFOLLOW)
+  except OSError:
+    return False
+
+  try:
+    file_stat = os.fstat(fd)
+    if (
+        not stat_mode.S_ISREG(file_stat.st_mode)
+        or _StatId(file_stat) != _CANARY.file_id
+    ):
+      return False
+
+    os.ftruncate(fd, 0)
+  except OSError:
+    return False
+  finally:
+    os.close(fd)
+
+  return True
+
+
+def _ForgetCanaryFile() -> None:
+  global _CANARY
+  _CANARY = None
+
+
+def _RemoveCanaryFile() -> None:
+  if _CANARY is None:
+    return
+
+  try:
+    os.unlink(_CANARY.path)
+  except OSError:
+    pass
+
+
+atexit.register(_RemoveCanaryFile)
+
+
+@functools.lru_cache(maxsize=1)
+def _GetClientBinaryName() -> str:
+  # The process name can change only on `exec`, which starts a new client.
+  return psutil.Process().name()
+
+
+@functools.lru_cache(maxsize=1)
+def _GetBootTime() -> float:
+  # The boot time is constant for the whole lifetime of the process.
+  return psutil.boot_time()
+
+
 def GetClientInformation() -> rdf_client.ClientInformation:
   return rdf_client.ClientInformation(
       client_name=config.CONFIG["Client.name"],
-      client_binary_name=psutil.Process().name(),
+      client_binary_name=_GetClientBinaryName(),
       client_description=config.CONFIG["Client.description"],
       client_version=int(config.CONFIG["Source.version_numeric"]),
       build_time=config.CONFIG["Client.build_time"],
@@ -269,23 +482,19 @@ class SendStartupInfo(actions.ActionPlugin):
       )
       return False
 
-    if not os.path.exists(interrogate_trigger_path):
+    # We try to remove the file right away and return True only if the removal
+    # is successful. This is to prevent a permission error + a crash loop from
+    # trigger infinite amount of interrogations. A single `unlink` call also
+    # tells us whether the file existed in the first place.
+    try:
+      os.unlink(interrogate_trigger_path)
+    except (FileNotFoundError, NotADirectoryError):
       logging.info(
           "Interrogate trigger file (%s) does not exist.",
           interrogate_trigger_path,
       )
       return False
-
-    logging.info(
-        "Interrogate trigger file exists: %s", interrogate_trigger_path
-    )
-
-    # First try to remove the file and return True only if the removal
-    # is successful. This is to prevent a permission error + a crash loop from
-    # trigger infinite amount of interrogations.
-    try:
-      os.remove(interrogate_trigger_path)
-    except (OSError, IOError) as e:
+    except OSError as e:
       logging.exception(
           "Not triggering interrogate - failed to remove the "
           "interrogate trigger file (%s): %s",
@@ -294,13 +503,17 @@ class SendStartupInfo(actions.ActionPlugin):
       )
       return False
 
+    logging.info(
+        "Interrogate trigger file existed and was removed: %s",
+        interrogate_trigger_path,
+    )
     return True
 
   def Run(self, unused_arg, ttl=None):
     """Returns the startup information."""
     logging.debug("Sending startup information.")
 
-    boot_time = rdfvalue.RDFDatetime.FromSecondsSinceEpoch(psutil.boot_time())
+    boot_time = rdfvalue.RDFDatetime.FromSecondsSinceEpoch(_GetBootTime())
     response = rdf_client.StartupInfo(
         boot_time=boot_time,
         client_info=GetClientInformation(),
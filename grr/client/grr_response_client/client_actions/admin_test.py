@@ -3,15 +3,19 @@
 
 import io
 import os
+import platform
 import tempfile
 from unittest import mock
 
 from absl import app
 from absl.testing import absltest
+import psutil
 
 from grr_response_client.client_actions import admin
 from grr_response_client.unprivileged import sandbox
 from grr_response_core import config
+from grr_response_core.lib import config_parser
+from grr_response_core.lib import rdfvalue
 from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr.test_lib import client_test_lib
 from grr.test_lib import test_lib
@@ -28,6 +32,9 @@ class ConfigActionTest(client_test_lib.EmptyActionTest):
     config_stubber.Start()
     self.addCleanup(config_stubber.Stop)
 
+    admin._CONFIG_SNAPSHOT_CACHE.clear()
+    self.addCleanup(admin._CONFIG_SNAPSHOT_CACHE.clear)
+
   def testUpdateConfiguration(self):
     """Test that we can update the config."""
     # A unique name on the filesystem for the writeback.
@@ -96,9 +103,213 @@ Client.server_urls:
     self.assertEqual(config.CONFIG["Client.foreman_check_frequency"], 3600)
     self.assertEqual(config.CONFIG["Client.server_urls"], location)
 
+  def testGetConfigReflectsUpdates(self):
+    request = rdf_protodict.Dict()
+    request["Client.foreman_check_frequency"] = 1800
+    self.RunAction(admin.UpdateConfiguration, request)
+
+    results = self.RunAction(admin.GetConfiguration)
+    self.assertLen(results, 1)
+    self.assertEqual(results[0]["Client.foreman_check_frequency"], 1800)
+
+    request = rdf_protodict.Dict()
+    request["Client.foreman_check_frequency"] = 3600
+    self.RunAction(admin.UpdateConfiguration, request)
+
+    results = self.RunAction(admin.GetConfiguration)
+    self.assertLen(results, 1)
+    self.assertEqual(results[0]["Client.foreman_check_frequency"], 3600)
+
+  def testGetConfigReusesSnapshot(self):
+    with mock.patch.object(
+        admin, "_ReadConfigValues", wraps=admin._ReadConfigValues
+    ) as read_config_values:
+      first_results = self.RunAction(admin.GetConfiguration)
+      second_results = self.RunAction(admin.GetConfiguration)
+
+    read_config_values.assert_called_once()
+
+    self.assertLen(first_results, 1)
+    self.assertLen(second_results, 1)
+    self.assertEqual(first_results[0].ToDict(), second_results[0].ToDict())
+    self.assertIsNot(first_results[0], second_results[0])
+
+  def testGetConfigReflectsOverrides(self):
+    frequency = config.CONFIG["Client.foreman_check_frequency"]
+
+    results = self.RunAction(admin.GetConfiguration)
+    self.assertEqual(results[0]["Client.foreman_check_frequency"], frequency)
+
+    with test_lib.ConfigOverrider({
+        "Client.foreman_check_frequency": frequency + 1,
+    }):
+      results = self.RunAction(admin.GetConfiguration)
+      self.assertEqual(
+          results[0]["Client.foreman_check_frequency"], frequency + 1
+      )
+
+    results = self.RunAction(admin.GetConfiguration)
+    self.assertEqual(results[0]["Client.foreman_check_frequency"], frequency)
+
+
+@absltest.skipIf(
+    platform.system() == "Windows",
+    "Config updates are not validated on Windows.",
+)
+class UpdateConfigurationCanaryTest(client_test_lib.EmptyActionTest):
+  """Tests the temporary file used for validating config updates."""
+
+  def setUp(self):
+    super().setUp()
+    config_stubber = test_lib.PreserveConfig()
+    config_stubber.Start()
+    self.addCleanup(config_stubber.Stop)
+
+    config.CONFIG.SetWriteBack(os.path.join(self.temp_dir, "writeback.yaml"))
+
+    admin._ForgetCanaryFile()
+    self.addCleanup(admin._ForgetCanaryFile)
+    self.addCleanup(admin._RemoveCanaryFile)
+
+  def _Update(self, frequency):
+    request = rdf_protodict.Dict()
+    request["Client.foreman_check_frequency"] = frequency
+    self.RunAction(admin.UpdateConfiguration, request)
+
+  def testCanaryFileIsReused(self):
+    self._Update(1800)
+    path = admin._CANARY.path
+
+    self._Update(3600)
+    self.assertEqual(admin._CANARY.path, path)
+    self.assertEqual(config.CONFIG["Client.foreman_check_frequency"], 3600)
+
+  def testCanaryFileIsEmptyAfterUpdate(self):
+    self._Update(1800)
+
+    self.assertTrue(os.path.exists(admin._CANARY.path))
+    self.assertEqual(os.path.getsize(admin._CANARY.path), 0)
+
+  def testCanaryFileIsRecreatedIfRemoved(self):
+    self._Update(1800)
+    path = admin._CANARY.path
+    os.unlink(path)
+
+    self._Update(3600)
+    self.assertNotEqual(admin._CANARY.path, path)
+    self.assertTrue(os.path.exists(admin._CANARY.path))
+    self.assertEqual(config.CONFIG["Client.foreman_check_frequency"], 3600)
+
+  def testCanaryFileIsRecreatedIfReplaced(self):
+    self._Update(1800)
+    path = admin._CANARY.path
+
+    target = os.path.join(self.temp_dir, "target")
+    with open(target, "w") as target_file:
+      target_file.write("foo")
+
+    os.unlink(path)
+    os.symlink(target, path)
+    self.addCleanup(os.unlink, path)
+
+    self._Update(3600)
+    self.assertNotEqual(admin._CANARY.path, path)
+
+    # The symlink target is left untouched.
+    with open(target, "r") as target_file:
+      self.assertEqual(target_file.read(), "foo")
+
+  def testCanaryFileIsKeptAfterFailedValidation(self):
+    self._Update(1800)
+    path = admin._CANARY.path
+
+    read_data = config_parser.GRRConfigFileParser.ReadData
+
+    def ReadData(parser):
+      # The canary is read when it is set as the writeback (while still empty)
+      # and then again for validation, after the changes are written to it.
+      if parser.config_path == path and os.path.getsize(path) > 0:
+        raise config_parser.ReadDataError("Broken config.")
+      return read_data(parser)
+
+    with mock.patch.object(
+        config_parser.GRRConfigFileParser,
+        "ReadData",
+        autospec=True,
+        side_effect=ReadData,
+    ):
+      with self.assertRaises(config_parser.ReadDataError):
+        self._Update(3600)
+
+    # The real config was not updated and the broken canary is left in place.
+    self.assertEqual(config.CONFIG["Client.foreman_check_frequency"], 1800)
+    self.assertTrue(os.path.exists(path))
+    self.assertGreater(os.path.getsize(path), 0)
+    self.addCleanup(os.unlink, path)
+
+    self._Update(3600)
+    self.assertNotEqual(admin._CANARY.path, path)
+    self.assertEqual(config.CONFIG["Client.foreman_check_frequency"], 3600)
+
+
+class GetLibraryVersionsTest(client_test_lib.EmptyActionTest):
+
+  def setUp(self):
+    super().setUp()
+    admin._GetLibraryVersionsBytes.cache_clear()
+    self.addCleanup(admin._GetLibraryVersionsBytes.cache_clear)
+
+  def testVersionsAreCollectedOnce(self):
+    foo_getter = mock.Mock(return_value="1.2.3")
+    bar_getter = mock.Mock(side_effect=RuntimeError("quux"))
+    library_map = {"foo": foo_getter, "bar": bar_getter}
+
+    with mock.patch.dict(admin._LIBRARY_MAP, library_map, clear=True):
+      first_results = self.RunAction(admin.GetLibraryVersions)
+      second_results = self.RunAction(admin.GetLibraryVersions)
+
+    foo_getter.assert_called_once()
+    bar_getter.assert_called_once()
+
+    self.assertLen(first_results, 1)
+    self.assertLen(second_results, 1)
+    self.assertEqual(first_results[0]["foo"], "1.2.3")
+    self.assertEqual(second_results[0]["foo"], "1.2.3")
+    self.assertIn("RuntimeError: quux", first_results[0]["bar"])
+    self.assertEqual(second_results[0]["bar"], first_results[0]["bar"])
+
+  def testRepliesAreSeparateObjects(self):
+    library_map = {"foo": lambda: "1.2.3"}
+
+    with mock.patch.dict(admin._LIBRARY_MAP, library_map, clear=True):
+      first_results = self.RunAction(admin.GetLibraryVersions)
+      first_results[0]["foo"] = "4.5.6"
+      second_results = self.RunAction(admin.GetLibraryVersions)
+
+    self.assertIsNot(second_results[0], first_results[0])
+    self.assertEqual(second_results[0]["foo"], "1.2.3")
+
 
 class GetClientInformationTest(absltest.TestCase):
 
+  def setUp(self):
+    super().setUp()
+    _ClearProcessInfoCaches()
+    self.addCleanup(_ClearProcessInfoCaches)
+
+  def testClientBinaryNameIsCollectedOnce(self):
+    with mock.patch.object(psutil, "Process") as process:
+      process.return_value.name.return_value = "grr-client"
+
+      self.assertEqual(
+          admin.GetClientInformation().client_binary_name, "grr-client"
+      )
+      self.assertEqual(
+          admin.GetClientInformation().client_binary_name, "grr-client"
+      )
+
+    process.assert_called_once()
+
   def testTimelineBtimeSupport(self):
     client_info = admin.GetClientInformation()
 
@@ -118,11 +329,31 @@ class GetClientInformationTest(absltest.TestCase):
 
 class SendStartupInfoTest(client_test_lib.EmptyActionTest):
 
+  def setUp(self):
+    super().setUp()
+    _ClearProcessInfoCaches()
+    self.addCleanup(_ClearProcessInfoCaches)
+
   def _RunAction(self):
     fake_worker = worker_mocks.FakeClientWorker()
     self.RunAction(admin.SendStartupInfo, grr_worker=fake_worker)
     return [m.payload for m in fake_worker.responses]
 
+  def testBootTimeIsCollectedOnce(self):
+    with mock.patch.object(
+        psutil, "boot_time", return_value=1234567890.0
+    ) as boot_time:
+      first_results = self._RunAction()
+      second_results = self._RunAction()
+
+    boot_time.assert_called_once()
+
+    expected = rdfvalue.RDFDatetime.FromSecondsSinceEpoch(1234567890)
+    self.assertLen(first_results, 1)
+    self.assertLen(second_results, 1)
+    self.assertEqual(first_results[0].boot_time, expected)
+    self.assertEqual(second_results[0].boot_time, expected)
+
   def testDoesNotSendInterrogateRequestWhenConfigOptionNotSet(self):
     results = self._RunAction()
 
@@ -170,20 +401,30 @@ class SendStartupInfoTest(client_test_lib.EmptyActionTest):
       self.assertLen(results, 1)
       self.assertFalse(results[0].interrogate_requested)
 
-  @mock.patch.object(os, "remove", side_effect=OSError("some error"))
-  def testInterrogateNotRequestedIfTriggerFileCanNotBeRemoved(self, _):
-    with tempfile.NamedTemporaryFile() as fd:
+  def testInterrogateNotRequestedIfTriggerFileCanNotBeRemoved(self):
+    with tempfile.NamedTemporaryFile(delete=False) as fd:
       trigger_path = fd.name
+    self.addCleanup(os.unlink, trigger_path)
 
     with test_lib.ConfigOverrider(
         {"Client.interrogate_trigger_path": trigger_path}
     ):
-      results = self._RunAction()
+      with mock.patch.object(os, "unlink", side_effect=OSError("some error")):
+        results = self._RunAction()
+
+    # The trigger file is still there, but no interrogate was requested.
+    self.assertTrue(os.path.exists(trigger_path))
 
     self.assertLen(results, 1)
     self.assertFalse(results[0].interrogate_requested)
 
 
+def _ClearProcessInfoCaches() -> None:
+  """Clears information about the process that is cached for its lifetime."""
+  admin._GetClientBinaryName.cache_clear()
+  admin._GetBootTime.cache_clear()
+
+
 def main(argv):
   test_lib.main(argv)
 
@@ -1,11 +1,14 @@
 #!/usr/bin/env python
 """A module with a client action for timeline collection."""
 
+from concurrent import futures
 import hashlib
 import os
 import stat as stat_mode
 from typing import Iterator
+from typing import List
 from typing import Optional
+from typing import Tuple
 
 import psutil
 
@@ -15,6 +18,8 @@ from grr_response_core.lib.rdfvalues import protodict as rdf_protodict
 from grr_response_core.lib.rdfvalues import timeline as rdf_timeline
 from grr_response_core.lib.util import iterator
 from grr_response_core.lib.util import statx
+from grr_response_core.lib.util import timeline
+from grr_response_proto import timeline_pb2
 
 
 # Indicates whether the timeline action will also collect file birth time.
@@ -33,11 +38,11 @@ class Timeline(actions.ActionPlugin):
     """Executes the client action."""
     fstype = GetFilesystemType(args.root)
     entries = iterator.Counted(Walk(args.root))
-    for entry_batch in rdf_timeline.TimelineEntry.SerializeStream(entries):
+    for entry_batch in timeline.SerializeTimelineEntryProtoStream(entries):
       entry_batch_blob = rdf_protodict.DataBlob(data=entry_batch)
       self.SendReply(entry_batch_blob, session_id=self._TRANSFER_STORE_ID)
 
-      entry_batch_blob_id = hashlib.sha256(entry_batch).digest()
+      entry_batch_blob_id = _BlobId(entry_batch)
 
       result = rdf_timeline.TimelineResult()
       result.entry_batch_blob_ids.append(entry_batch_blob_id)
@@ -51,7 +56,13 @@ class Timeline(actions.ActionPlugin):
       entries.Reset()
 
 
-def Walk(root: bytes) -> Iterator[rdf_timeline.TimelineEntry]:
+def _BlobId(data: bytes) -> bytes:
+  """Computes the blobstore identifier (SHA-256 digest) of the given data."""
+  # The digest is only used as a content address, which is what the flag records.
+  return hashlib.sha256(data, usedforsecurity=False).digest()
+
+
+def Walk(root: bytes) -> Iterator[timeline_pb2.TimelineEntry]:
   """Walks the filesystem collecting stat information.
 
   This method will recursively descend to all sub-folders and sub-sub-folders
@@ -63,7 +74,9 @@ def Walk(root: bytes) -> Iterator[rdf_timeline.TimelineEntry]:
     root: A path to the root folder at which the recursion should start.
 
   Returns:
-    An iterator over timeline entries with stat information about each file.
+    An iterator over timeline entry protos with stat information about each
+    file. Entries are raw protos (rather than RDF wrappers) so that they can be
+    serialized without any intermediate conversions.
 
   Raises:
     OSError: If it is not possible to collect information about the root folder.
@@ -84,31 +97,128 @@ def Walk(root: bytes) -> Iterator[rdf_timeline.TimelineEntry]:
   # flow should fail, giving the user a meaningful error message.
   dev = os.lstat(root).st_dev
 
-  def Recurse(path: bytes) -> Iterator[rdf_timeline.TimelineEntry]:
-    """Performs the recursive walk over the file hierarchy."""
+  def Traverse() -> Iterator[timeline_pb2.TimelineEntry]:
+    """Performs the depth-first walk over the file hierarchy."""
     try:
-      stat = statx.Get(path)
+      root_stat = statx.Get(root)
     except OSError:
       return
 
-    yield rdf_timeline.TimelineEntry.FromStatx(path, stat)
+    # Instead of recursing (which makes every entry bubble up through a chain
+    # of nested generators as deep as the current path) we maintain an explicit
+    # stack of entries still to visit. Children are pushed in reverse order so
+    # that they are visited in the order they were listed in.
+    pending = [(root, root_stat)]
 
-    # We want to recurse only to folders on the same device.
-    if not stat_mode.S_ISDIR(stat.mode) or stat.dev != dev:
-      return
+    # The pool lives only as long as the walk: it is shut down once the walk is
+    # exhausted or the generator is closed, so no threads are left behind.
+    with _StatExecutor() as executor:
+      while pending:
+        path, stat = pending.pop()
+
+        yield timeline.TimelineEntryProtoFromStatx(path, stat)
+
+        # We want to recurse only to folders on the same device.
+        if not stat_mode.S_ISDIR(stat.mode) or stat.dev != dev:
+          continue
+
+        children = _StatChildren(path, executor)
+        children.reverse()
+        pending.extend(children)
+
+  return Traverse()
+
+
+# Directories with at most that many children are stated sequentially, as for
+# them the overhead of dispatching work to the thread pool is not worth it.
+_STAT_PARALLEL_THRESHOLD = 8
+
+
+def _StatExecutor() -> futures.ThreadPoolExecutor:
+  """Creates a thread pool used for stating directory children in parallel."""
+  # Stat calls (both through `os` and `ctypes`) release the GIL, so on high-
+  # latency filesystems they can be in flight concurrently.
+  max_workers = min(32, (os.cpu_count() or 1) * 2)
+  return futures.ThreadPoolExecutor(
+      max_workers=max_workers,
+      thread_name_prefix="TimelineStat",
+  )
+
+
+def _StatChildren(
+    path: bytes,
+    executor: futures.Executor,
+) -> List[Tuple[bytes, statx.Result]]:
+  """Collects stat information about all children of the given directory.
+
+  Children are stated in one batch per directory (in parallel, if there are
+  enough of them). Where supported, the names are resolved relative to a
+  descriptor of the directory, so the kernel does not have to walk the full
+  path of every single child.
+
+  Args:
+    path: A path to the directory to collect children information for.
+    executor: An executor to use for stating the children in parallel.
 
+  Returns:
+    A list of paths of the children paired with their stat information, in the
+    order they were listed in. Those that could not be stated are skipped.
+  """
+  if not statx.DIR_FD_SUPPORT:
     try:
       childnames = os.listdir(path)
     except OSError:
-      childnames = []
+      return []
+
+    childpaths = [os.path.join(path, childname) for childname in childnames]
+    stats = _StatMany(childpaths, dir_fd=None, executor=executor)
+  else:
+    try:
+      # The directory could have been replaced with a symlink since it was
+      # stated, so we refuse to follow those to keep the walk within the
+      # hierarchy.
+      dir_fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY | os.O_NOFOLLOW)
+    except OSError:
+      return []
+
+    try:
+      # Listing through the descriptor avoids resolving the directory path
+      # once again and guarantees that names are stated in the directory they
+      # were listed from. Names are listed as strings in such case, so we
+      # encode them back (this is lossless thanks to `surrogateescape`).
+      childnames = list(map(os.fsencode, os.listdir(dir_fd)))
+      childpaths = [os.path.join(path, childname) for childname in childnames]
+      stats = _StatMany(childnames, dir_fd=dir_fd, executor=executor)
+    except OSError:
+      return []
+    finally:
+      os.close(dir_fd)
+
+  return [
+      (childpath, stat)
+      for childpath, stat in zip(childpaths, stats)
+      if stat is not None
+  ]
+
+
+def _StatMany(
+    paths: List[bytes],
+    dir_fd: Optional[int],
+    executor: futures.Executor,
+) -> List[Optional[statx.Result]]:
+  """Stats given paths, returning `None` for those that could not be stated."""
+
+  def Stat(path: bytes) -> Optional[statx.Result]:
+    try:
+      return statx.Get(path, dir_fd=dir_fd)
+    except OSError:
+      return None
 
-    # TODO(hanuszczak): Implement more efficient auto-batcher instead of having
-    # multi-level iterators.
-    for childname in childnames:
-      for entry in Recurse(os.path.join(path, childname)):
-        yield entry
+  if len(paths) <= _STAT_PARALLEL_THRESHOLD:
+    return list(map(Stat, paths))
 
-  return Recurse(root)
+  # `map` preserves the order of results, so the walk stays deterministic.
+  return list(executor.map(Stat, paths))
 
 
 def GetFilesystemType(root: bytes) -> Optional[str]:
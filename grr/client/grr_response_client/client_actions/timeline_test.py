@@ -6,6 +6,7 @@ import os
 import platform
 import random
 import stat as stat_mode
+import threading
 import time
 from typing import List
 
@@ -110,6 +111,43 @@ class WalkTest(absltest.TestCase):
       self.assertIn(bar_filepath.encode("utf-8"), paths)
       self.assertIn(baz_filepath.encode("utf-8"), paths)
 
+  def testManyFiles(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as dirpath:
+      filepaths = []
+      for idx in range(128):
+        filepath = os.path.join(dirpath, f"foo{idx}")
+        _Touch(filepath, content=b"x" * idx)
+        filepaths.append(filepath)
+
+      entries = list(timeline.Walk(dirpath.encode("utf-8")))
+      self.assertLen(entries, 128 + 1)
+
+      sizes = {entry.path: entry.size for entry in entries[1:]}
+      self.assertCountEqual(sizes, [_.encode("utf-8") for _ in filepaths])
+      for idx, filepath in enumerate(filepaths):
+        self.assertEqual(sizes[filepath.encode("utf-8")], idx)
+
+  def testNoThreadsLeftAfterWalk(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as dirpath:
+      for idx in range(128):
+        _Touch(os.path.join(dirpath, f"foo{idx}"))
+
+      entries = list(timeline.Walk(dirpath.encode("utf-8")))
+      self.assertLen(entries, 128 + 1)
+      self.assertEmpty(_StatThreads())
+
+  def testNoThreadsLeftAfterWalkIsClosed(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as dirpath:
+      for idx in range(128):
+        _Touch(os.path.join(dirpath, f"foo{idx}"))
+
+      entries = timeline.Walk(dirpath.encode("utf-8"))
+      next(entries)
+      next(entries)
+      entries.close()
+
+      self.assertEmpty(_StatThreads())
+
   def testNestedDirectories(self):
     with temp.AutoTempDirPath(remove_non_empty=True) as root_dirpath:
       foobar_dirpath = os.path.join(root_dirpath, "foo", "bar")
@@ -291,6 +329,14 @@ class GetFilesystemType(absltest.TestCase):
         timeline.GetFilesystemType(os.path.join(path, "foobar"))
 
 
+def _StatThreads() -> List[threading.Thread]:
+  return [
+      thread
+      for thread in threading.enumerate()
+      if thread.name.startswith("TimelineStat")
+  ]
+
+
 def _Touch(filepath: str, content: bytes = b"") -> None:
   with io.open(filepath, mode="wb") as filedesc:
     filedesc.write(content)
@@ -7,6 +7,7 @@ from typing import Iterator
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_core.lib.util import gzchunked
 from grr_response_core.lib.util import statx
+from grr_response_core.lib.util import timeline
 from grr_response_proto import timeline_pb2
 
 
@@ -32,46 +33,26 @@ class TimelineEntry(rdf_structs.RDFProtoStruct):
 
   @classmethod
   def FromStat(cls, path: bytes, stat: os.stat_result) -> "TimelineEntry":
-    entry = cls()
-    entry.path = path
-
-    entry.mode = stat.st_mode
-    entry.size = stat.st_size
-
-    entry.dev = stat.st_dev
-    entry.ino = stat.st_ino
-
-    entry.uid = stat.st_uid
-    entry.gid = stat.st_gid
-
-    entry.atime_ns = stat.st_atime_ns
-    entry.mtime_ns = stat.st_mtime_ns
-    entry.ctime_ns = stat.st_ctime_ns
-
-    return entry
+    # Setting fields one by one on the RDF wrapper is expensive (as every
+    # assignment is validated), so the proto is created in one go instead.
+    proto = timeline_pb2.TimelineEntry(
+        path=path,
+        mode=stat.st_mode,
+        size=stat.st_size,
+        dev=stat.st_dev,
+        ino=stat.st_ino,
+        uid=stat.st_uid,
+        gid=stat.st_gid,
+        atime_ns=stat.st_atime_ns,
+        mtime_ns=stat.st_mtime_ns,
+        ctime_ns=stat.st_ctime_ns,
+    )
+    return cls.FromSerializedBytes(proto.SerializeToString())
 
   @classmethod
   def FromStatx(cls, path: bytes, stat: statx.Result) -> "TimelineEntry":
-    entry = cls()
-    entry.path = path
-
-    entry.mode = stat.mode
-    entry.size = stat.size
-
-    entry.dev = stat.dev
-    entry.ino = stat.ino
-
-    entry.uid = stat.uid
-    entry.gid = stat.gid
-
-    entry.attributes = stat.attributes
-
-    entry.atime_ns = stat.atime_ns
-    entry.btime_ns = stat.btime_ns
-    entry.mtime_ns = stat.mtime_ns
-    entry.ctime_ns = stat.ctime_ns
-
-    return entry
+    proto = timeline.TimelineEntryProtoFromStatx(path, stat)
+    return cls.FromSerializedBytes(proto.SerializeToString())
 
   @classmethod
   def SerializeStream(
@@ -13,11 +13,15 @@ import operator
 import os
 import platform
 from typing import NamedTuple
+from typing import Optional
 
 
 # Indicates whether the call also collects information about the birth time.
 BTIME_SUPPORT: bool
 
+# Indicates whether paths can be resolved relative to a directory descriptor.
+DIR_FD_SUPPORT: bool
+
 
 # TODO(hanuszczak): Migrate to data classes on support for 3.7 is available.
 class Result(NamedTuple):
@@ -53,16 +57,24 @@ class Result(NamedTuple):
   dev: int
 
 
-def Get(path: bytes) -> Result:
+def Get(path: bytes, dir_fd: Optional[int] = None) -> Result:
   """Collects detailed stat information about the path.
 
   Args:
     path: A path to the file for which the information should be retrieved.
+    dir_fd: An (optional) descriptor of a directory the path is relative to.
+      Resolving names of directory children relative to the directory spares
+      the kernel from walking the full path for each of them. Can be used only
+      if `DIR_FD_SUPPORT` is set.
 
   Returns:
     An object with detailed start information.
+
+  Raises:
+    OSError: If it is not possible to collect information about the path.
+    ValueError: If `dir_fd` is specified but `DIR_FD_SUPPORT` is not set.
   """
-  return _GetImpl(path)
+  return _GetImpl(path, dir_fd)
 
 
 class _StatxTimestampStruct(ctypes.Structure):
@@ -127,6 +139,7 @@ class _StatxStruct(ctypes.Structure):
 
 
 # https://elixir.bootlin.com/linux/v3.4/source/include/linux/fcntl.h
+_AT_FDCWD = -100
 _AT_SYMLINK_NOFOLLOW = 0x100
 _AT_STATX_SYNC_AS_STAT = 0x0000
 
@@ -181,11 +194,11 @@ if platform.system() == "Linux":
     ]
     _statx.restype = ctypes.c_int
 
-    def _GetImplLinuxStatx(path: bytes) -> Result:
+    def _GetImplLinuxStatx(path: bytes, dir_fd: Optional[int]) -> Result:
       """A Linux-specific stat implementation through `statx`."""
       c_result = _StatxStruct()
       c_status = _statx(
-          0,
+          _AT_FDCWD if dir_fd is None else dir_fd,
           path,
           _AT_SYMLINK_NOFOLLOW | _AT_STATX_SYNC_AS_STAT,
           _STATX_ALL,
@@ -213,12 +226,13 @@ if platform.system() == "Linux":
 
     _GetImpl = _GetImplLinuxStatx
     BTIME_SUPPORT = True
+    DIR_FD_SUPPORT = True
 
   else:
 
-    def _GetImplLinux(path: bytes) -> Result:
+    def _GetImplLinux(path: bytes, dir_fd: Optional[int]) -> Result:
       """A generic Linux-specific stat implementation."""
-      stat_obj = os.lstat(path)
+      stat_obj = os.stat(path, dir_fd=dir_fd, follow_symlinks=False)
       return Result(
           attributes=0,  # Not available.
           nlink=stat_obj.st_nlink,
@@ -237,12 +251,13 @@ if platform.system() == "Linux":
 
     _GetImpl = _GetImplLinux
     BTIME_SUPPORT = False
+    DIR_FD_SUPPORT = True
 
 elif platform.system() == "Darwin":
 
-  def _GetImplMacos(path: bytes) -> Result:
+  def _GetImplMacos(path: bytes, dir_fd: Optional[int]) -> Result:
     """A macOS-specific stat implementation."""
-    stat_obj = os.lstat(path)
+    stat_obj = os.stat(path, dir_fd=dir_fd, follow_symlinks=False)
     # Nanosecond-precision birthtime is not available, with approximate it with
     # the float-precision one.
     st_birthtime_ns = int(stat_obj.st_birthtime * 10**9)  # pytype: disable=attribute-error
@@ -265,11 +280,15 @@ elif platform.system() == "Darwin":
 
   _GetImpl = _GetImplMacos
   BTIME_SUPPORT = True
+  DIR_FD_SUPPORT = True
 
 elif platform.system() == "Windows":
 
-  def _GetImplWindows(path: bytes) -> Result:
+  def _GetImplWindows(path: bytes, dir_fd: Optional[int]) -> Result:
     """A Windows-specific stat implementation."""
+    if dir_fd is not None:
+      raise ValueError("Directory descriptors are not supported on Windows")
+
     stat_obj = os.lstat(path)
 
     # pylint: disable=line-too-long
@@ -297,3 +316,4 @@ elif platform.system() == "Windows":
 
   _GetImpl = _GetImplWindows
   BTIME_SUPPORT = True
+  DIR_FD_SUPPORT = False
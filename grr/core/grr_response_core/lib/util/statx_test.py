@@ -121,6 +121,21 @@ class GetTest(absltest.TestCase):
       with self.assertRaises(OSError):
         statx.Get(os.path.join(tempdir, "non-existing-file").encode("utf-8"))
 
+  @absltest.skipUnless(statx.DIR_FD_SUPPORT, "Directory descriptors unsupported")
+  def testDirFd(self):
+    with temp.AutoTempDirPath(remove_non_empty=True) as tempdir:
+      with open(os.path.join(tempdir, "foo"), mode="wb") as tempfile_handle:
+        tempfile_handle.write(b"foobar")
+
+      dir_fd = os.open(tempdir, os.O_RDONLY)
+      try:
+        result = statx.Get(b"foo", dir_fd=dir_fd)
+      finally:
+        os.close(dir_fd)
+
+      self.assertTrue(stat.S_ISREG(result.mode))
+      self.assertEqual(result.size, 6)
+
 
 if __name__ == "__main__":
   absltest.main()
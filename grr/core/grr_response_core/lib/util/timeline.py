@@ -4,17 +4,68 @@
 from typing import Iterator
 
 from grr_response_core.lib.util import gzchunked
+from grr_response_core.lib.util import statx
 from grr_response_proto import timeline_pb2
 
 
-def _ParseTimelineEntryProto(bstr: bytes) -> timeline_pb2.TimelineEntry:
-  r = timeline_pb2.TimelineEntry()
-  r.ParseFromString(bstr)
-  return r
+_TimelineEntry = timeline_pb2.TimelineEntry
+
+
+def TimelineEntryProtoFromStatx(
+    path: bytes,
+    stat: statx.Result,
+) -> timeline_pb2.TimelineEntry:
+  """Creates a timeline entry proto from the given stat information."""
+  return _TimelineEntry(
+      path=path,
+      mode=stat.mode,
+      size=stat.size,
+      dev=stat.dev,
+      ino=stat.ino,
+      uid=stat.uid,
+      gid=stat.gid,
+      attributes=stat.attributes,
+      atime_ns=stat.atime_ns,
+      btime_ns=stat.btime_ns,
+      mtime_ns=stat.mtime_ns,
+      ctime_ns=stat.ctime_ns,
+  )
+
+
+def SerializeTimelineEntryProtoStream(
+    entries: Iterator[timeline_pb2.TimelineEntry],
+) -> Iterator[bytes]:
+  """Serializes given TimelineEntry protos into gzchunked stream chunks."""
+  return gzchunked.Serialize(map(_TimelineEntry.SerializeToString, entries))
 
 
 def DeserializeTimelineEntryProtoStream(
     entries: Iterator[bytes],
 ) -> Iterator[timeline_pb2.TimelineEntry]:
   """Deserializes given gzchunked stream chunks into TimelineEntry protos."""
-  return map(_ParseTimelineEntryProto, gzchunked.Deserialize(entries))
+  return map(_TimelineEntry.FromString, gzchunked.Deserialize(entries))
+
+
+def DeserializeTimelineEntryProtoStreamReuse(
+    entries: Iterator[bytes],
+) -> Iterator[timeline_pb2.TimelineEntry]:
+  """Deserializes given gzchunked stream chunks into a reused TimelineEntry.
+
+  Unlike `DeserializeTimelineEntryProtoStream`, this function does not allocate
+  a new proto for every entry. Instead, the same proto object is cleared and
+  filled with every consecutive entry. This means that the yielded object is
+  valid only until the iterator is advanced, so it must not be retained by the
+  caller (it should be copied if needed).
+
+  Args:
+    entries: An iterator over gzchunked stream chunks.
+
+  Yields:
+    The same proto object, filled with data of consecutive entries.
+  """
+  entry = _TimelineEntry()
+
+  for serialized_entry in gzchunked.Deserialize(entries):
+    entry.Clear()
+    entry.MergeFromString(serialized_entry)
+    yield entry
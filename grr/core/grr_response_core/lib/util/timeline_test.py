@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+from absl.testing import absltest
+
+from grr_response_core.lib.util import gzchunked
+from grr_response_core.lib.util import statx
+from grr_response_core.lib.util import temp
+from grr_response_core.lib.util import timeline
+from grr_response_proto import timeline_pb2
+
+
+class TimelineEntryProtoFromStatxTest(absltest.TestCase):
+
+  def testFile(self):
+    with temp.AutoTempFilePath() as filepath:
+      with open(filepath, mode="wb") as filedesc:
+        filedesc.write(b"foobar")
+
+      stat = statx.Get(filepath.encode("utf-8"))
+
+    entry = timeline.TimelineEntryProtoFromStatx(b"/foo", stat)
+    self.assertEqual(entry.path, b"/foo")
+    self.assertEqual(entry.size, 6)
+    self.assertEqual(entry.mode, stat.mode)
+    self.assertEqual(entry.dev, stat.dev)
+    self.assertEqual(entry.ino, stat.ino)
+    self.assertEqual(entry.uid, stat.uid)
+    self.assertEqual(entry.gid, stat.gid)
+    self.assertEqual(entry.attributes, stat.attributes)
+    self.assertEqual(entry.atime_ns, stat.atime_ns)
+    self.assertEqual(entry.btime_ns, stat.btime_ns)
+    self.assertEqual(entry.mtime_ns, stat.mtime_ns)
+    self.assertEqual(entry.ctime_ns, stat.ctime_ns)
+
+
+class SerializeTimelineEntryProtoStreamTest(absltest.TestCase):
+
+  def testEmpty(self):
+    chunks = timeline.SerializeTimelineEntryProtoStream(iter([]))
+    self.assertEmpty(list(chunks))
+
+  def testRoundTrip(self):
+    entries = [
+        timeline_pb2.TimelineEntry(path=b"/foo", size=42),
+        timeline_pb2.TimelineEntry(path=b"/bar", mode=0o100644),
+    ]
+
+    chunks = timeline.SerializeTimelineEntryProtoStream(iter(entries))
+    deserialized = list(timeline.DeserializeTimelineEntryProtoStream(chunks))
+    self.assertEqual(deserialized, entries)
+
+
+class DeserializeTimelineEntryProtoStreamTest(absltest.TestCase):
+
+  def testMultipleEntries(self):
+    entries = [
+        timeline_pb2.TimelineEntry(path=b"/foo", size=42),
+        timeline_pb2.TimelineEntry(path=b"/bar", mode=0o100644),
+        timeline_pb2.TimelineEntry(path=b"/baz", btime_ns=1337),
+    ]
+
+    chunks = gzchunked.Serialize(_.SerializeToString() for _ in entries)
+    deserialized = list(timeline.DeserializeTimelineEntryProtoStream(chunks))
+    self.assertEqual(deserialized, entries)
+
+
+class DeserializeTimelineEntryProtoStreamReuseTest(absltest.TestCase):
+
+  def testEmpty(self):
+    chunks = gzchunked.Serialize(iter([]))
+    deserialized = timeline.DeserializeTimelineEntryProtoStreamReuse(chunks)
+    self.assertEmpty(list(deserialized))
+
+  def testMultipleEntries(self):
+    entries = [
+        timeline_pb2.TimelineEntry(path=b"/foo", size=42),
+        timeline_pb2.TimelineEntry(path=b"/bar", mode=0o100644),
+        timeline_pb2.TimelineEntry(path=b"/baz", btime_ns=1337),
+    ]
+
+    chunks = gzchunked.Serialize(_.SerializeToString() for _ in entries)
+    deserialized = timeline.DeserializeTimelineEntryProtoStreamReuse(chunks)
+
+    # Fields set only by previous entries must not leak into the next ones, so
+    # we compare copies of entries as they are being yielded.
+    copies = []
+    for entry in deserialized:
+      entry_copy = timeline_pb2.TimelineEntry()
+      entry_copy.CopyFrom(entry)
+      copies.append(entry_copy)
+
+    self.assertEqual(copies, entries)
+
+
+if __name__ == "__main__":
+  absltest.main()
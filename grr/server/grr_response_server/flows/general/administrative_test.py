@@ -567,8 +567,10 @@ magic_return_str = "foo(%s)"
     self.assertEqual(new_si, si)
 
     # Simulate a reboot.
+    # The client caches the boot time for the lifetime of its process, so the
+    # cached getter is patched rather than `psutil.boot_time` itself.
     current_boot_time = psutil.boot_time()
-    with mock.patch.object(psutil, "boot_time",
+    with mock.patch.object(admin, "_GetBootTime",
                            lambda: current_boot_time + 600):
 
       # Run it again - this should now update the boot time.
@@ -1,12 +1,15 @@
 #!/usr/bin/env python
 """Tests for API client and approvals-related API calls."""
 
+import contextlib
 import threading
 import time
+from typing import Callable, Iterator
 from unittest import mock
 
 from absl import app
 
+from grr_api_client import utils as api_utils
 from grr_response_core import config
 from grr_response_core.lib import rdfvalue
 from grr_response_server.gui import api_auth_manager
@@ -96,8 +99,7 @@ class ApiClientLibApprovalsTest(
     )
     self.assertFalse(approval.data.is_valid)
 
-    def ProcessApproval():
-      time.sleep(1)
+    def GrantApproval():
       self.GrantClientApproval(
           client_id,
           requestor=self.test_username,
@@ -105,13 +107,9 @@ class ApiClientLibApprovalsTest(
           approver="foo",
       )
 
-    thread = threading.Thread(name="ProcessApprover", target=ProcessApproval)
-    thread.start()
-    try:
+    with _EventDrivenPolling(approval, GrantApproval):
       result_approval = approval.WaitUntilValid()
-      self.assertTrue(result_approval.data.is_valid)
-    finally:
-      thread.join()
+    self.assertTrue(result_approval.data.is_valid)
 
   def testCreateHuntApproval(self):
     h_id = self.StartHunt()
@@ -134,8 +132,7 @@ class ApiClientLibApprovalsTest(
     )
     self.assertFalse(approval.data.is_valid)
 
-    def ProcessApproval():
-      time.sleep(1)
+    def GrantApproval():
       self.GrantHuntApproval(
           h_id,
           requestor=self.test_username,
@@ -143,14 +140,76 @@ class ApiClientLibApprovalsTest(
           approver="approver",
       )
 
-    ProcessApproval()
-    thread = threading.Thread(name="HuntApprover", target=ProcessApproval)
-    thread.start()
-    try:
+    with _EventDrivenPolling(approval, GrantApproval):
       result_approval = approval.WaitUntilValid()
-      self.assertTrue(result_approval.data.is_valid)
+    self.assertTrue(result_approval.data.is_valid)
+
+
+@contextlib.contextmanager
+def _EventDrivenPolling(
+    approval,
+    grant: Callable[[], None],
+) -> Iterator[None]:
+  """Makes `WaitUntilValid` of the given approval event-driven.
+
+  The approval is granted in a separate thread, but only after it has been
+  fetched once, which guarantees that `WaitUntilValid` observes it as not yet
+  valid first. Instead of sleeping for the whole polling interval, the polling
+  loop then waits only until the grant is finished.
+
+  If the grant fails, its exception is re-raised from the polling loop. If the
+  approval is still not valid after it has been granted, the polling loop fails
+  instead of spinning until its timeout.
+
+  Args:
+    approval: An approval object to patch.
+    grant: A function granting the approval.
+
+  Yields:
+    Nothing, the patches are applied for the duration of the context.
+  """
+  polled = threading.Event()
+  granted = threading.Event()
+  errors = []
+
+  def Approve():
+    polled.wait()
+    try:
+      grant()
+    except Exception as error:  # pylint: disable=broad-except
+      errors.append(error)
     finally:
-      thread.join()
+      granted.set()
+
+  get = approval.Get
+
+  def Get():
+    result = get()
+    polled.set()
+    return result
+
+  def Sleep(unused_secs):
+    if granted.is_set():
+      raise AssertionError("Approval is not valid after being granted")
+
+    granted.wait()
+    if errors:
+      raise errors[0]
+
+  thread = threading.Thread(name="Approver", target=Approve)
+  thread.start()
+  try:
+    with mock.patch.object(approval, "Get", Get):
+      # Only the `time` module reference of the API client utilities is
+      # replaced, so that sleeps elsewhere (e.g. in the server threads) are not
+      # affected.
+      with mock.patch.object(
+          api_utils, "time", mock.Mock(time=time.time, sleep=Sleep)
+      ):
+        yield
+  finally:
+    polled.set()
+    thread.join()
 
 
 def main(argv):
@@ -8,6 +8,7 @@ from grr_response_core.lib import utils
 from grr_response_core.lib.rdfvalues import structs as rdf_structs
 from grr_response_core.lib.util import body
 from grr_response_core.lib.util import chunked
+from grr_response_core.lib.util import timeline as timeline_util
 from grr_response_proto import objects_pb2
 from grr_response_proto.api import timeline_pb2
 from grr_response_server import data_store
@@ -97,7 +98,10 @@ class ApiGetCollectedTimelineHandler(api_call_handler_base.ApiCallHandler):
       if fstype is not None and fstype.lower() == "ntfs":
         opts.inode_format = body.Opts.InodeFormat.NTFS_FILE_REFERENCE
 
-    entries = timeline.ProtoEntries(client_id=client_id, flow_id=flow_id)
+    # Body lines are generated one entry at a time, so there is no need to
+    # allocate a new proto for each of them.
+    blobs = timeline.Blobs(client_id=client_id, flow_id=flow_id)
+    entries = timeline_util.DeserializeTimelineEntryProtoStreamReuse(blobs)
     content = body.Stream(entries, opts=opts)
 
     filename = "timeline_{}.body".format(flow_id)